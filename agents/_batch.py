@@ -0,0 +1,66 @@
+import io
+import json
+import time
+from typing import Dict, Optional
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+TERMINAL_FAILURE_STATUSES = ("failed", "expired", "cancelled")
+
+
+def submit_chat_batch(client, bodies: Dict[str, dict]) -> str:
+    """
+    Upload one chat completion request per `custom_id` as a JSONL batch file
+    and start an OpenAI batch job for it. Returns the batch id.
+    """
+    lines = [
+        json.dumps({"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_URL, "body": body})
+        for custom_id, body in bodies.items()
+    ]
+    batch_file = io.BytesIO("\n".join(lines).encode("utf-8"))
+    batch_file.name = "batch.jsonl"
+
+    uploaded = client.files.create(file=batch_file, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=CHAT_COMPLETIONS_URL,
+        completion_window="24h",
+    )
+    return batch.id
+
+
+def retrieve_chat_batch(client, batch_id: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Check on a batch job. Returns None while it is still running, otherwise a
+    dict mapping each `custom_id` to the message content (None if that request failed).
+
+    Raises:
+        RuntimeError: If the batch job failed, expired or was cancelled.
+    """
+    batch = client.batches.retrieve(batch_id)
+    if batch.status in TERMINAL_FAILURE_STATUSES:
+        raise RuntimeError(f"Batch {batch_id} ended with status '{batch.status}'.")
+    if batch.status != "completed":
+        return None
+
+    results = {}
+    if batch.output_file_id:
+        output = client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+            else:
+                results[record["custom_id"]] = None
+    return results
+
+
+def wait_for_chat_batch(client, batch_id: str, poll_interval: float = 30.0) -> Dict[str, Optional[str]]:
+    """Block until the batch job finishes and return its results (see retrieve_chat_batch)."""
+    while True:
+        results = retrieve_chat_batch(client, batch_id)
+        if results is not None:
+            return results
+        time.sleep(poll_interval)
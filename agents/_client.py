@@ -0,0 +1,44 @@
+import functools
+
+import httpx
+import streamlit as st
+from openai import AsyncOpenAI, OpenAI
+
+# One connection pool for the whole process, so repeated calls reuse open TLS connections.
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+# The SDK retries connection errors, 429s and 5xx with exponential backoff; 4xx fail fast.
+MAX_RETRIES = 4
+REQUEST_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+@functools.lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """The process-wide keep-alive httpx pool, shared by every sync OpenAI client."""
+    return httpx.Client(limits=HTTP_LIMITS)
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    """The process-wide OpenAI client, created on first use."""
+    return OpenAI(
+        api_key=st.secrets["OPENAI_API_KEY"],
+        http_client=get_http_client(),
+        max_retries=MAX_RETRIES,
+        timeout=REQUEST_TIMEOUT,
+    )
+
+
+def new_async_client() -> AsyncOpenAI:
+    """
+    A fresh AsyncOpenAI client with the same settings as get_client().
+
+    Async connection pools are tied to the event loop that opened them, and each
+    asyncio.run() starts a new loop, so callers should create one per run and
+    close it with `async with`.
+    """
+    return AsyncOpenAI(
+        api_key=st.secrets["OPENAI_API_KEY"],
+        http_client=httpx.AsyncClient(limits=HTTP_LIMITS),
+        max_retries=MAX_RETRIES,
+        timeout=REQUEST_TIMEOUT,
+    )
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "travel-ai")
+
+_lock = threading.Lock()
+_stores: Dict[str, Dict[str, Any]] = {}
+
+
+def make_key(**parts: Any) -> str:
+    """Build a stable cache key from the inputs that determine a model response."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _path(namespace: str) -> str:
+    return os.path.join(CACHE_DIR, f"{namespace}.json")
+
+
+def _store(namespace: str) -> Dict[str, Any]:
+    """Load a namespace's JSON file into memory once per process. Call with _lock held."""
+    if namespace not in _stores:
+        try:
+            with open(_path(namespace), "r", encoding="utf-8") as f:
+                _stores[namespace] = json.load(f)
+        except (OSError, ValueError):
+            _stores[namespace] = {}
+    return _stores[namespace]
+
+
+def write_file_atomic(path: str, data: bytes) -> None:
+    """Write `data` to `path` via a temp file + rename, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write cache file '{path}': {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _flush(namespace: str) -> None:
+    """Atomically rewrite a namespace's JSON file. Call with _lock held."""
+    write_file_atomic(_path(namespace), json.dumps(_stores[namespace]).encode("utf-8"))
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file's contents in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_path(namespace: str, filename: str) -> str:
+    """Location of a file-valued cache entry, e.g. file_path("transcripts", f"{key}.txt")."""
+    return os.path.join(CACHE_DIR, namespace, filename)
+
+
+def get(key: str, namespace: str = "places") -> Optional[Any]:
+    """Return the cached value for `key`, or None on a miss or if the entry has expired."""
+    with _lock:
+        entry = _store(namespace).get(key)
+    if not isinstance(entry, dict) or "value" not in entry:
+        return None
+    expires_at = entry.get("expires_at")
+    if expires_at is not None and expires_at < time.time():
+        return None
+    return entry["value"]
+
+
+def set(key: str, value: Any, namespace: str = "places", ttl: Optional[float] = None) -> None:
+    """Cache `value` (must be JSON-serializable) under `key`, optionally for `ttl` seconds."""
+    set_many({key: value}, namespace, ttl=ttl)
+
+
+def set_many(items: Dict[str, Any], namespace: str = "places", ttl: Optional[float] = None) -> None:
+    """Cache several values with a single write to disk."""
+    if not items:
+        return
+    expires_at = time.time() + ttl if ttl is not None else None
+    with _lock:
+        _store(namespace).update({key: {"value": value, "expires_at": expires_at} for key, value in items.items()})
+        _flush(namespace)
@@ -0,0 +1,14 @@
+import re
+import unicodedata
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Matching key for a place or city name that ignores case, accents, punctuation
+    and whitespace, e.g. " Café de  Flore! " and "cafe de flore" -> "cafedeflore".
+    """
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub("", without_accents)
@@ -1,103 +1,294 @@
 import argparse
+import asyncio
 import json
-import os
+import math
 import re
-from openai import OpenAI
+import numpy as np
 from typing import Optional
-import streamlit as st
+
+from agents import _llm_cache
+from agents._names import normalize_name
+from agents._client import get_client, new_async_client
+from agents._batch import submit_chat_batch, wait_for_chat_batch
 
 try:
-    import tomllib
+    import orjson
+    _json_loads = orjson.loads
 except ImportError:
-    try:
-        import tomli as tomllib
-    except ImportError:
-        tomllib = None
+    _json_loads = json.loads
 
+# Upper bound on in-flight OpenAI requests when fetching place details.
+MAX_CONCURRENT_REQUESTS = 20
+# Places per chat completion; keeps each prompt and JSON reply well within token limits.
+PLACES_PER_REQUEST = 50
+PLACE_DETAILS_MODEL = "gpt-4o-mini"
+# Largest knapsack table width; bigger budgets are solved in coarser cost units.
+KNAPSACK_MAX_UNITS = 10_000
 
-def _load_secret_from_toml(key: str) -> Optional[str]:
-    if tomllib is None:
-        return None
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    secret_dir = os.path.join(base_dir, 'secret')
-    candidates = [
-        os.path.join(secret_dir, 'keys.local.toml'),
-        os.path.join(secret_dir, 'keys.toml'),
-        os.path.join(secret_dir, 'keys.example.toml'),
-    ]
-    for path in candidates:
-        try:
-            if not os.path.exists(path):
-                continue
-            with open(path, 'rb') as f:
-                data = tomllib.load(f)
-            secret_value = data.get('openai', {}).get(key)
-            if secret_value:
-                return secret_value
-        except Exception:
-            continue
-    return None
+_BUDGET_STRIP = re.compile(r'[^\d.]')
+_NUM_RE = re.compile(r'(\d+\.?\d*)')
 
 
 def parse_budget(budget_str):
     """Parse budget string (e.g., '$300') into a number."""
-    return float(re.sub(r'[^\d.]', '', budget_str))
+    return float(_BUDGET_STRIP.sub('', budget_str))
 
 
-def get_place_details(client, place):
-    """Get estimated cost and review for a place using OpenAI."""
-    prompt = f"Provide an estimated cost (in USD) and a review score (1-10) for visiting '{place}'. Return the output in JSON format with keys 'cost' and 'review_score'."
+def _coerce_place_details(place, details):
+    """Convert the model's cost/review_score values into floats, or None if unusable."""
+    # Basic validation and type conversion
+    if not isinstance(details, dict) or 'cost' not in details or 'review_score' not in details:
+        return None
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides travel information."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        raw_response = response.choices[0].message.content
-        details = json.loads(raw_response)
-        # Basic validation and type conversion
-        if 'cost' in details and 'review_score' in details:
-            try:
-                # Use regex to find the first number in the string
-                cost_str = str(details['cost'])
-                review_str = str(details['review_score'])
-                
-                cost_match = re.search(r'(\d+\.?\d*)', cost_str)
-                review_match = re.search(r'(\d+\.?\d*)', review_str)
-
-                if cost_match and review_match:
-                    details['cost'] = float(cost_match.group(1))
-                    details['review_score'] = float(review_match.group(1))
-                    return details
-                else:
-                    print(f"Warning: Could not extract a valid number for cost or review_score for {place}. Skipping.")
-                    return None
-            except (ValueError, TypeError):
-                print(f"Warning: Could not convert cost or review_score to a number for {place}. Skipping.")
-                return None
+        # Use regex to find the first number in the string
+        cost_str = str(details['cost'])
+        review_str = str(details['review_score'])
+
+        cost_match = _NUM_RE.search(cost_str)
+        review_match = _NUM_RE.search(review_str)
+
+        if cost_match and review_match:
+            details['cost'] = float(cost_match.group(1))
+            details['review_score'] = float(review_match.group(1))
+            return details
+        else:
+            print(f"Warning: Could not extract a valid number for cost or review_score for {place}. Skipping.")
+            return None
+    except (ValueError, TypeError):
+        print(f"Warning: Could not convert cost or review_score to a number for {place}. Skipping.")
         return None
+
+
+def _build_details_request(places: list) -> dict:
+    """Build the chat completion request body asking for cost/review_score of `places`."""
+    place_list = "\n".join(f"- {place}" for place in places)
+    prompt = (
+        "For each of the following places, provide an estimated cost (in USD) and a review score (1-10) for visiting it.\n"
+        f"{place_list}\n\n"
+        "Return the output as a JSON object keyed by the exact place name, where each value is an object "
+        "with keys 'cost' and 'review_score'."
+    )
+    return {
+        "model": PLACE_DETAILS_MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a helpful assistant that provides travel information."},
+            {"role": "user", "content": prompt}
+        ],
+        "response_format": {"type": "json_object"},
+        # Deterministic output so cached details stay valid for the same place
+        "temperature": 0,
+    }
+
+
+def _parse_details_response(places: list, raw_response: Optional[str]) -> dict:
+    """Map each place to its coerced details from a JSON reply (None if unavailable)."""
+    try:
+        batch_details = _json_loads(raw_response)
+        if not isinstance(batch_details, dict):
+            raise ValueError("response is not a JSON object")
     except Exception as e:
-        print(f"An error occurred while fetching details for {place}: {e}")
-        return None
+        print(f"An error occurred while parsing details for {', '.join(places)}: {e}")
+        return {place: None for place in places}
 
+    # The model sometimes changes case, accents or punctuation in the names it echoes back
+    by_name = {}
+    for key, details in batch_details.items():
+        by_name.setdefault(normalize_name(str(key)), details)
 
-def budget_agent(non_neg_places: list, neg_places: list, total_budget: float):
+    results = {}
+    for place in places:
+        details = batch_details.get(place)
+        if details is None:
+            details = by_name.get(normalize_name(place))
+        if details is None and len(places) == 1 and len(batch_details) == 1:
+            # A single-place request can only be answering that place
+            details = next(iter(batch_details.values()))
+        if details is None:
+            print(f"Warning: No details returned for {place}.")
+        results[place] = _coerce_place_details(place, details)
+    return results
+
+
+def _chunk_places(places: list) -> list:
+    return [places[i:i + PLACES_PER_REQUEST] for i in range(0, len(places), PLACES_PER_REQUEST)]
+
+
+def _place_cache_key(place: str) -> str:
+    return _llm_cache.make_key(model=PLACE_DETAILS_MODEL, place=place)
+
+
+def _split_cached(places: list):
+    """Return (details already cached on disk, places that still need a lookup)."""
+    cached, missing = {}, []
+    for place in places:
+        details = _llm_cache.get(_place_cache_key(place))
+        if details is not None:
+            cached[place] = details
+        else:
+            missing.append(place)
+    return cached, missing
+
+
+def _cache_details(all_details: dict) -> None:
+    _llm_cache.set_many({
+        _place_cache_key(place): details for place, details in all_details.items() if details is not None
+    })
+
+
+async def get_places_details_batch(client, places: list) -> dict:
     """
-    Main function for the budget agent.
+    Get estimated cost and review for several places using a single OpenAI call.
+    Returns a dict mapping each place to its details (or None if unavailable).
     """
-    # Filter places
-    unique_neg_places = [place for place in list(set(neg_places)) if place not in non_neg_places]
+    try:
+        response = await client.chat.completions.create(**_build_details_request(places))
+        raw_response = response.choices[0].message.content
+    except Exception as e:
+        print(f"An error occurred while fetching details for {', '.join(places)}: {e}")
+        return {place: None for place in places}
+
+    return _parse_details_response(places, raw_response)
+
+
+async def _fetch_details(chunks: list) -> dict:
+    """Request each chunk of places concurrently, at most MAX_CONCURRENT_REQUESTS at a time."""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async with new_async_client() as client:
+        async def bounded(chunk):
+            async with sem:
+                return await get_places_details_batch(client, chunk)
+
+        chunk_results = await asyncio.gather(*(bounded(chunk) for chunk in chunks))
+
+    fetched = {}
+    for chunk_result in chunk_results:
+        fetched.update(chunk_result)
+    return fetched
+
+
+def _unmatched(fetched: dict) -> list:
+    """Places a chunked reply had no usable details for; they are re-requested one per call."""
+    unmatched = [place for place, details in fetched.items() if details is None]
+    if unmatched:
+        print(f"Re-requesting details for {len(unmatched)} place(s) one at a time.")
+    return unmatched
 
-    client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
 
+async def get_all_place_details(places: list) -> dict:
+    """
+    Fetch details for every place, PLACES_PER_REQUEST places per OpenAI call.
+    Chunks are requested concurrently, at most MAX_CONCURRENT_REQUESTS at a time.
+    Places a chunk's reply left out are re-requested on their own, so none is dropped.
+    Places already in the on-disk cache are not requested again.
+    """
+    all_details, places = _split_cached(places)
+    if not places:
+        return all_details
+
+    fetched = await _fetch_details(_chunk_places(places))
+    unmatched = _unmatched(fetched)
+    if unmatched:
+        fetched.update(await _fetch_details([[place] for place in unmatched]))
+    _cache_details(fetched)
+    all_details.update(fetched)
+    return all_details
+
+
+def get_all_place_details_via_batch_api(places: list, poll_interval: float = 30.0) -> dict:
+    """
+    Same as get_all_place_details, but submitted through the OpenAI Batch API
+    (half the cost, completes within 24h). Blocks until the batch finishes.
+    """
+    all_details, places = _split_cached(places)
+    if not places:
+        return all_details
+
+    chunks = _chunk_places(places)
+    client = get_client()
+
+    bodies = {f"places-{i}": _build_details_request(chunk) for i, chunk in enumerate(chunks)}
+    batch_id = submit_chat_batch(client, bodies)
+    print(f"Submitted place details batch {batch_id}; waiting for completion...")
+    outputs = wait_for_chat_batch(client, batch_id, poll_interval=poll_interval)
+
+    fetched = {}
+    for i, chunk in enumerate(chunks):
+        fetched.update(_parse_details_response(chunk, outputs.get(f"places-{i}")))
+    unmatched = _unmatched(fetched)
+    if unmatched:
+        # A handful of follow-ups isn't worth another batch round-trip of up to 24h
+        fetched.update(asyncio.run(_fetch_details([[place] for place in unmatched])))
+    _cache_details(fetched)
+    all_details.update(fetched)
+    return all_details
+
+
+def _dedupe_places(non_neg_places: list, neg_places: list):
+    """
+    Drop repeated places (keeping first-seen order) and any neg place that is
+    already a non-neg place, so each place is looked up and counted once.
+    """
+    non_neg_places = list(dict.fromkeys(non_neg_places))
+    non_neg_set = set(non_neg_places)
+    unique_neg_places = [place for place in dict.fromkeys(neg_places) if place not in non_neg_set]
+    return non_neg_places, unique_neg_places
+
+
+def _knapsack_select(places_details: list, budget: float) -> list:
+    """
+    Exact 0-1 knapsack: pick the subset of places with the highest total
+    review_score whose cost fits in `budget`. Costs are rounded up to whole
+    dollars so the selection never exceeds the budget. Runs in
+    O(n * min(budget, KNAPSACK_MAX_UNITS)); larger budgets are solved in
+    coarser cost units, still rounding costs up.
+    """
+    capacity = int(math.floor(budget))
+    if capacity <= 0 or not places_details:
+        return []
+
+    weights = [int(math.ceil(d['cost'])) for d in places_details]
+    total_weight = sum(weights)
+    if total_weight <= capacity:
+        # Everything fits, which is the usual case
+        return list(places_details)
+    capacity = min(capacity, total_weight)
+
+    if capacity > KNAPSACK_MAX_UNITS:
+        unit = math.ceil(capacity / KNAPSACK_MAX_UNITS)
+        weights = [math.ceil(w / unit) for w in weights]
+        capacity //= unit
+
+    # dp[b] = best total review_score using at most b cost units
+    dp = [0.0] * (capacity + 1)
+    taken = []
+    for weight, d in zip(weights, places_details):
+        row = bytearray(capacity + 1)
+        for b in range(capacity, weight - 1, -1):
+            candidate = dp[b - weight] + d['review_score']
+            if candidate > dp[b]:
+                dp[b] = candidate
+                row[b] = 1
+        taken.append(row)
+
+    # Walk back through the decisions to recover the chosen places
+    selected = []
+    b = capacity
+    for i in range(len(places_details) - 1, -1, -1):
+        if taken[i][b]:
+            selected.append(places_details[i])
+            b -= weights[i]
+    selected.reverse()
+    return selected
+
+
+def _select_places(non_neg_places: list, unique_neg_places: list, all_details: dict, total_budget: float) -> dict:
+    """Keep every non-neg place, then spend the remaining budget on the best-rated neg places."""
     # Get details for non-neg places and calculate initial cost
     non_neg_places_details = []
     current_cost = 0
     for place in non_neg_places:
-        details = get_place_details(client, place)
+        details = all_details.get(place)
         if details:
             non_neg_places_details.append({'place': place, **details})
             current_cost += details['cost']
@@ -107,20 +298,21 @@ def budget_agent(non_neg_places: list, neg_places: list, total_budget: float):
     # Get details for neg places and calculate score
     neg_places_details = []
     for place in unique_neg_places:
-        details = get_place_details(client, place)
+        details = all_details.get(place)
         if details and details['cost'] > 0:
             score = details['review_score'] / details['cost']
             neg_places_details.append({'place': place, **details, 'score': score})
 
-    # Sort neg places by score (descending)
-    neg_places_details.sort(key=lambda x: x['score'], reverse=True)
+    # Sort neg places by score (descending), argsorting the scores in C
+    scores = np.fromiter((d['score'] for d in neg_places_details), dtype=np.float64, count=len(neg_places_details))
+    order = np.argsort(-scores, kind='stable')
+    neg_places_details = [neg_places_details[i] for i in order]
 
     # Select optimal neg places
     final_places = non_neg_places_details
-    for place_details in neg_places_details:
-        if current_cost + place_details['cost'] <= total_budget:
-            final_places.append(place_details)
-            current_cost += place_details['cost']
+    for place_details in _knapsack_select(neg_places_details, remaining_budget):
+        final_places.append(place_details)
+        current_cost += place_details['cost']
 
     output = {
         'final_places': final_places,
@@ -129,31 +321,56 @@ def budget_agent(non_neg_places: list, neg_places: list, total_budget: float):
     }
 
     return output
-    
-    # output_path = 'budget_output.json'
-    # with open(output_path, 'w') as f:
-    #     json.dump(output, f, indent=4)
 
-    # print(f"Budget analysis complete. Output saved to {output_path}")
+
+def budget_agent(non_neg_places: list, neg_places: list, total_budget: float):
+    """
+    Main function for the budget agent.
+    """
+    # Filter places
+    non_neg_places, unique_neg_places = _dedupe_places(non_neg_places, neg_places)
+
+    # Look up non-neg and neg places together so they share batched requests
+    all_details = asyncio.run(get_all_place_details(non_neg_places + unique_neg_places))
+
+    return _select_places(non_neg_places, unique_neg_places, all_details, total_budget)
+
+
+def budget_agent_batch(non_neg_places: list, neg_places: list, total_budget: float, poll_interval: float = 30.0):
+    """
+    Non-interactive variant of budget_agent that fetches place details through
+    the OpenAI Batch API. Cheaper, but may take minutes to hours to return.
+    """
+    non_neg_places, unique_neg_places = _dedupe_places(non_neg_places, neg_places)
+
+    all_details = get_all_place_details_via_batch_api(non_neg_places + unique_neg_places, poll_interval=poll_interval)
+
+    return _select_places(non_neg_places, unique_neg_places, all_details, total_budget)
 
 
-# if __name__ == '__main__':
-#     parser = argparse.ArgumentParser(description="Plan a trip within a budget.")
-#     parser.add_argument("multiple_reels_output", help="Path to the JSON output from multiple_reels.py")
-#     parser.add_argument("style_agent_output", help="Path to the JSON output from style_agent.py")
-#     parser.add_argument("total_budget", help="Total budget for the trip (e.g., '$500').")
-    
-#     args = parser.parse_args()
+def _load_place_list(path: str, key: str) -> list:
+    """Read `key` from a JSON file holding either {key: [...]} or a bare list of places."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else data.get(key, [])
 
-#     # Load inputs
-#     multiple_reels_data = load_json_file(args.multiple_reels_output)
-#     style_agent_data = load_json_file(args.style_agent_output)
 
-#     if multiple_reels_data is None or style_agent_data is None:
-#         print("Error: Could not load input files. Exiting.")
-#         exit()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Plan a trip within a budget, fetching place details through the OpenAI Batch API.")
+    parser.add_argument("multiple_reels_output", help="JSON file with the must-see places ('non_neg_places' or a list)")
+    parser.add_argument("style_agent_output", help="JSON file with the optional places ('neg_places' or a list)")
+    parser.add_argument("total_budget", help="Total budget for the trip (e.g., '$500').")
+    parser.add_argument("--output", default="budget_output.json", help="Where to write the selected places (default: budget_output.json)")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Seconds between batch status checks (default: 30)")
+    args = parser.parse_args()
 
-#     non_neg_places = multiple_reels_data.get('non_neg_places', [])
-#     neg_places = style_agent_data.get('neg_places', [])
+    output = budget_agent_batch(
+        _load_place_list(args.multiple_reels_output, 'non_neg_places'),
+        _load_place_list(args.style_agent_output, 'neg_places'),
+        parse_budget(args.total_budget),
+        poll_interval=args.poll_interval,
+    )
 
-#     budget_agent(non_neg_places, neg_places, args.total_budget)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=4)
+    print(f"Budget analysis complete. Output saved to {args.output}")
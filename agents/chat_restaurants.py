@@ -1,6 +1,4 @@
-import openai
-from openai import OpenAI
-import streamlit as st
+from agents._client import get_client
 
 def build_prompt(dietary_restrictions: str, location: str) -> str:
     """
@@ -26,7 +24,7 @@ def get_restaurant_suggestions(dietary_restrictions: str, location: str):
     """
     Query OpenAI with a constructed prompt and return restaurant suggestions.
     """
-    client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+    client = get_client()
 
     prompt = build_prompt(dietary_restrictions, location)
 
@@ -4,8 +4,16 @@ import streamlit as st
 from openai import OpenAI
 import re
 
+from agents._client import get_client
+
 from typing import List, Literal, Optional, TypedDict
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 
 TransportMode = Literal["walk", "bus", "metro", "train", "taxi", "rideshare", "bike", "ferry", "flight", "none"]
 
@@ -30,12 +38,16 @@ class TripPlan(TypedDict):
     itinerary: List[ItineraryItem]
 
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+_JSON_FENCE = re.compile(r"```json\s*(\{.*?\})\s*```", re.S)
+_JSON_FENCE_ANY = re.compile(r"```json\s*(\[.*?\]|\{.*?\})\s*```", re.S)
+_JSON_OVERVIEW = re.compile(r"(\{\s*\"trip_overview\".*\})", re.S)
+
+
 def build_prompt(location_dates: Dict[str, Dict[str, str]], preferences: str, transport_options: List[str], travelers: int, locations: List[str], addl_info) -> str:
-    """Create an LLM prompt that requests both a human-readable itinerary and a strict JSON block.
+    """Create an LLM prompt that requests a strict JSON itinerary.
 
 
-    We ask the model to emit a JSON block with a top-level `itinerary` array and also a markdown-friendly explanation.
+    The model is called in JSON mode, so it returns a single object with `trip_overview` and an `itinerary` array.
     """
     # short description of location order
     loc_str = "\n".join([f"- {loc} ({dates['start']} to {dates['end']})" for loc, dates in location_dates.items()])
@@ -43,9 +55,7 @@ def build_prompt(location_dates: Dict[str, Dict[str, str]], preferences: str, tr
 
 
     system = (
-    "You are an expert travel planner. Given the trip specification below, produce two outputs separated clearly:\n"
-    "1) A JSON block wrapped in triple backticks labeled as ```json``` that contains a STRICT machine-readable itinerary.\n"
-    "2) A human-readable markdown itinerary summary suitable for sending to the traveler.\n\n"
+    "You are an expert travel planner. Given the trip specification below, produce a STRICT machine-readable itinerary as a single JSON object.\n\n"
     "STRICT JSON REQUIREMENTS:\n"
     "- Top-level object must include:\n"
     "   - `trip_overview` (string, 1–2 sentences)\n"
@@ -67,8 +77,7 @@ def build_prompt(location_dates: Dict[str, Dict[str, str]], preferences: str, tr
     "- All fields must appear, even if null or empty.\n"
     "- No trailing commas, no comments, must be valid JSON.\n"
     "- Ensure logical consistency: start_time < end_time, duration_minutes matches the difference when possible.\n"
-    "- Prefer public transport when available. Assume moderate budget unless specified.\n\n"
-    "After the JSON section, write a concise but engaging MARKDOWN itinerary summary for the traveler with times, travel instructions, and cultural tips for each stop.\n"
+    "- Prefer public transport when available. Assume moderate budget unless specified.\n"
 )
 
 
@@ -80,7 +89,7 @@ def build_prompt(location_dates: Dict[str, Dict[str, str]], preferences: str, tr
     f"Allowed transport modes: {', '.join(transport_options)}\n"
     f"Number of travelers: {travelers}\n\n"
     f"Additional Info on Locations: {addl_info}\n\n"
-    "Return the JSON in a single ```json``` fenced code block and then the markdown itinerary."
+    "Return a single JSON object only, with no markdown fences or text around it."
     )
 
 
@@ -88,35 +97,23 @@ def build_prompt(location_dates: Dict[str, Dict[str, str]], preferences: str, tr
     return full_prompt
 
 def extract_json_from_text(text: str) -> Any:
-    """Try to find the first JSON block in text and load it."""
-    # find triple-backtick json block
-    m = re.search(r"```json\s*(\{.*?\})\s*```", text, flags=re.S)
+    """Load model output as JSON, falling back to the first fenced or embedded JSON block in the text."""
+    if not text or not isinstance(text, str):
+        return None
+    # fast path: JSON-mode responses are a bare JSON document
+    try:
+        return _json_loads(text)
+    except (ValueError, TypeError):
+        pass
+    # fallback: triple-backtick json block, then the first `{"trip_overview": ...}` chunk
+    m = _JSON_FENCE.search(text) or _JSON_FENCE_ANY.search(text) or _JSON_OVERVIEW.search(text)
     if not m:
-        m3 = m = re.search(r"```json\s*(\[.*?\]|\{.*?\})\s*```", text, flags=re.S)
-        if not m3:
-            # fallback: try to find first `{...}` large chunk
-            m2 = re.search(r"(\{\s*\"trip_overview\".*\})", text, flags=re.S)
-            if not m2:
-                # last resort: try to find any JSON-like object
-                try:
-                    return json.loads(text)
-                except Exception:
-                    return None
-            else:
-                try:
-                    return json.loads(m2.group(1))
-                except Exception:
-                    return None
-        else:
-            try:
-                return json.loads(m3.group(1))
-            except Exception:
-                return None
+        return None
     try:
-        return json.loads(m.group(1))
-    except Exception:
+        return _json_loads(m.group(1))
+    except (ValueError, TypeError):
         return None
-    
+
 def generate_itinerary(location_dates, locations, preferences, transport_options, travelers, addl_info, temperature=0.2, max_tokens=2000, model="gpt-4o-mini"):
     if OpenAI is None:
         st.error("openai client library not available. Please `pip install openai` and restart the app.")
@@ -125,13 +122,14 @@ def generate_itinerary(location_dates, locations, preferences, transport_options
 
     with st.spinner("Generating itinerary — this may take a few seconds..."):
         try:
-            response = client.chat.completions.create(
+            response = get_client().chat.completions.create(
                 model=model,
                 messages=[
                 {"role": "system", "content": "You are a helpful travel planning assistant."},
                 {"role": "user", "content": prompt},
                 ],
                 temperature=float(temperature),
+                response_format={"type": "json_object"},
                 # max_tokens=int(max_tokens),
             )
 
@@ -141,7 +139,7 @@ def generate_itinerary(location_dates, locations, preferences, transport_options
 
 
             st.subheader("Raw model output")
-            st.code(raw_text[:100], language="markdown")
+            st.code(raw_text[:100], language="json")
             print("raw text: ")
             print(raw_text)
 
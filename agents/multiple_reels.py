@@ -1,45 +1,89 @@
+import asyncio
 import os
-from openai import OpenAI
+import subprocess
 import streamlit as st
+import shutil
 import tempfile
 
-from moviepy.editor import VideoFileClip
-import os
+from agents import _llm_cache
+from agents._client import new_async_client
 
 import base64
+import mmap
+
+# Upper bound on reels going through ffmpeg/transcription at the same time.
+MAX_CONCURRENT_REELS = 4
+TRANSCRIBE_MODEL = "gpt-4o-mini-transcribe"
 
 def image_to_data_url(path):
-    with open(path, "rb") as f:
-        data = base64.b64encode(f.read()).decode("utf-8")
+    # Encode straight from a memory map so the raw JPEG bytes are never copied into a Python buffer
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = base64.b64encode(mm).decode("ascii")
     return f"data:image/jpeg;base64,{data}"
 
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-
 def extract_audio(video_path):
-    clip = VideoFileClip(video_path)
+    # Mono 16 kHz 64 kbps is plenty for transcription and keeps the upload small
     audio_path = os.path.splitext(video_path)[0] + ".mp3"
-    clip.audio.write_audiofile(audio_path)
+    subprocess.run(
+        ["ffmpeg", "-y", "-i", video_path, "-vn", "-ac", "1", "-ar", "16000", "-b:a", "64k", audio_path],
+        check=True,
+        capture_output=True,
+    )
     return audio_path
 
 
-def process_reel(video_path):
+async def transcribe_audio(client, audio_path):
+    with open(audio_path, "rb") as f:
+        transcription = await client.audio.transcriptions.create(
+            model=TRANSCRIBE_MODEL,
+            file=f
+        )
+    return transcription.text
+
+
+def _cached_montage(video_path, video_hash, frame_interval, grid_width):
+    """create_montage_from_video, reusing a montage already built for the same video bytes and settings."""
+    key = _llm_cache.make_key(
+        video_sha256=video_hash, frame_interval=frame_interval, grid_width=grid_width, tile_size=MONTAGE_TILE_SIZE,
+    )
+    cached_path = _llm_cache.file_path("montages", f"{key}.jpg")
+    if os.path.exists(cached_path):
+        return cached_path
+
+    montage_path = create_montage_from_video(video_path, frame_interval=frame_interval, grid_width=grid_width)
+    with open(montage_path, "rb") as f:
+        _llm_cache.write_file_atomic(cached_path, f.read())
+    return montage_path
+
+
+async def process_reel(client, video_path):
     """
     Extracts audio + creates montage for a reel.
     Returns dict with both paths.
+    Transcripts and montages are cached by the video's content hash.
     """
-    # Extract audio track
-    audio_path = extract_audio(video_path)
-
-    # Transcribe audio
-    with open(audio_path, "rb") as f:
-        transcript = client.audio.transcriptions.create(
-            model="gpt-4o-mini-transcribe",
-            file=f
-        ).text
-
-    # Create montage
-    montage_path = create_montage_from_video(video_path, frame_interval=2, grid_width=3)
+    video_hash = await asyncio.to_thread(_llm_cache.file_sha256, video_path)
+
+    async def transcribe():
+        transcript_path = _llm_cache.file_path(
+            "transcripts", f"{_llm_cache.make_key(video_sha256=video_hash, model=TRANSCRIBE_MODEL)}.txt"
+        )
+        if os.path.exists(transcript_path):
+            with open(transcript_path, "r", encoding="utf-8") as f:
+                return f.read()
+
+        # Extract audio track, then transcribe it
+        audio_path = await asyncio.to_thread(extract_audio, video_path)
+        transcript = await transcribe_audio(client, audio_path)
+        _llm_cache.write_file_atomic(transcript_path, transcript.encode("utf-8"))
+        return transcript
+
+    # The montage is built while the audio is being transcribed
+    transcript, montage_path = await asyncio.gather(
+        transcribe(),
+        asyncio.to_thread(_cached_montage, video_path, video_hash, 2, 3),
+    )
 
     return {
         "video": video_path,
@@ -47,7 +91,7 @@ def process_reel(video_path):
         "transcript": transcript,
     }
 
-def summarize_reel_batch(reels_batch):
+async def summarize_reel_batch(client, reels_batch):
     """
     Sends a batch of reels (montage + transcript) to GPT for summary.
     """
@@ -85,47 +129,59 @@ def summarize_reel_batch(reels_batch):
         })
 
 
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model="gpt-4o-mini",
         messages=messages,
         response_format={"type": "json_object"},
     )
     return response.choices[0].message.content
 
+async def _process_and_summarize(video_paths, batch_size):
+    """Process every reel concurrently, then summarize all batches concurrently."""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REELS)
+
+    async with new_async_client() as client:
+        async def bounded(video_path):
+            async with sem:
+                return await process_reel(client, video_path)
+
+        reels = await asyncio.gather(*(bounded(video_path) for video_path in video_paths))
+        batches = [reels[i:i + batch_size] for i in range(0, len(reels), batch_size)]
+        return await asyncio.gather(*(summarize_reel_batch(client, batch) for batch in batches))
+
 def process_all_reels(video_paths, batch_size=3):
-    results = []
-    batch = []
+    video_files = []
 
     for uploaded_file in video_paths:
         st.subheader(f"Processing: {uploaded_file.name}")
 
         # Step 2: Save uploaded file temporarily
         with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_video:
-            tmp_video.write(uploaded_file.read())
-            video_path = tmp_video.name
-
-        reel_data = process_reel(video_path)
-        batch.append(reel_data)
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, tmp_video, length=1024 * 1024)
+            video_files.append(tmp_video.name)
 
-        if len(batch) == batch_size:
-            results.append(summarize_reel_batch(batch))
-            st.success(f"Summary for {uploaded_file.name}:")
-            st.write(results[-1])
-            batch = []
+    results = asyncio.run(_process_and_summarize(video_files, batch_size))
 
-    # Process leftover batch
-    if batch:
-        results.append(summarize_reel_batch(batch))
+    for i, summary in enumerate(results):
+        last_file = video_paths[min((i + 1) * batch_size, len(video_paths)) - 1]
+        st.success(f"Summary for {last_file.name}:")
+        st.write(summary)
 
     return results
 
 import cv2
 import math
+import numpy as np
 import tempfile
-from PIL import Image
 import os
 
-def create_montage_from_video(video_path, frame_interval=2, grid_width=3):
+# Longest side (px) of each montage tile. The vision model bills per 512px tile,
+# so a 3x3 grid of 256px frames stays within a handful of tiles.
+MONTAGE_TILE_SIZE = 256
+MONTAGE_JPEG_QUALITY = 80
+
+def create_montage_from_video(video_path, frame_interval=2, grid_width=3, tile_size=MONTAGE_TILE_SIZE):
     """
     Create a montage from a video by extracting 1 frame every `frame_interval` seconds.
     
@@ -133,52 +189,53 @@ def create_montage_from_video(video_path, frame_interval=2, grid_width=3):
         video_path (str): Path to video file (e.g. .mp4).
         frame_interval (int): Interval in seconds between frames to extract.
         grid_width (int): Number of columns in the montage grid.
+        tile_size (int): Longest side in pixels of each frame in the grid (aspect ratio is kept).
     
     Returns:
         str: Path to the saved montage image.
     """
     # Extract frames every `frame_interval` seconds
     vidcap = cv2.VideoCapture(video_path)
-    fps = int(vidcap.get(cv2.CAP_PROP_FPS)) or 1
-    step = fps * frame_interval
-    frames = []
-    count, saved = 0, 0
-
-    tmpdir = tempfile.mkdtemp()
-
-    while True:
+    fps = vidcap.get(cv2.CAP_PROP_FPS)
+    frame_count = vidcap.get(cv2.CAP_PROP_FRAME_COUNT)
+    # Unknown duration: keep sampling until a read past the end fails
+    duration_s = frame_count / fps if fps > 0 and frame_count > 0 else None
+    images = []
+
+    # Seek straight to each sample timestamp instead of decoding every frame in between
+    sample = 0
+    while duration_s is None or sample * frame_interval < duration_s:
+        vidcap.set(cv2.CAP_PROP_POS_MSEC, sample * frame_interval * 1000)
         success, image = vidcap.read()
         if not success:
             break
-        if count % step == 0:
-            frame_path = os.path.join(tmpdir, f"frame_{saved}.jpg")
-            cv2.imwrite(frame_path, image)
-            frames.append(frame_path)
-            saved += 1
-        count += 1
+        images.append(image)
+        sample += 1
 
     vidcap.release()
 
-    if not frames:
+    if not images:
         raise ValueError("No frames extracted from video!")
 
-    # Load extracted frames
-    images = [Image.open(f) for f in frames]
-    w, h = images[0].size
-    images = [img.resize((w, h)) for img in images]
+    # Frames are kept in memory as BGR uint8 arrays, downscaled to the tile size
+    src_h, src_w = images[0].shape[:2]
+    scale = min(1.0, tile_size / max(src_h, src_w))
+    h, w = max(1, round(src_h * scale)), max(1, round(src_w * scale))
 
     # Compute grid
     cols = grid_width
     rows = math.ceil(len(images) / cols)
-    montage = Image.new('RGB', (cols*w, rows*h), color=(0, 0, 0))
+    montage = np.zeros((rows*h, cols*w, 3), dtype=np.uint8)
 
     for idx, img in enumerate(images):
+        if img.shape[:2] != (h, w):
+            img = cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
         x = (idx % cols) * w
         y = (idx // cols) * h
-        montage.paste(img, (x, y))
+        montage[y:y+h, x:x+w] = img
 
     # Save montage
-    montage_path = os.path.join(tmpdir, "montage.jpg")
-    montage.save(montage_path)
+    montage_path = os.path.join(tempfile.mkdtemp(), "montage.jpg")
+    cv2.imwrite(montage_path, montage, [cv2.IMWRITE_JPEG_QUALITY, MONTAGE_JPEG_QUALITY])
 
     return montage_path
@@ -1,56 +1,86 @@
 import streamlit as st
+import shutil
 import tempfile
 import subprocess
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from moviepy.editor import VideoFileClip
 import os
 
-from agents.get_video_text import extract_text_from_video
+from agents._client import get_client
+from agents.multiple_reels import create_montage_from_video, image_to_data_url
+
+# Number of uploaded videos processed at the same time.
+MAX_WORKERS = 8
 
 def extract_audio(video_path):
-    clip = VideoFileClip(video_path)
+    # Mono 16 kHz 64 kbps is plenty for transcription and keeps the upload small
     audio_path = os.path.splitext(video_path)[0] + ".mp3"
-    clip.audio.write_audiofile(audio_path)
+    subprocess.run(
+        ["ffmpeg", "-y", "-i", video_path, "-vn", "-ac", "1", "-ar", "16000", "-b:a", "64k", audio_path],
+        check=True,
+        capture_output=True,
+    )
     return audio_path
 
 
-def process_videos(uploaded_files: list):
-    client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-
-    for uploaded_file in uploaded_files:
-        st.subheader(f"Processing: {uploaded_file.name}")
-
-        # Step 2: Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_video:
-            tmp_video.write(uploaded_file.read())
-            video_path = tmp_video.name
+def _process_one(client, uploaded_file):
+    """Transcribe and summarize a single uploaded video. Runs in a worker thread, so no st.* calls."""
+    # Step 2: Save uploaded file temporarily
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_video:
+        shutil.copyfileobj(uploaded_file, tmp_video, length=1024 * 1024)
+        video_path = tmp_video.name
 
+    def transcribe():
         # Step 3: Extract audio with ffmpeg
         audio_path = extract_audio(video_path)
 
         # Step 4: Transcribe audio
         with open(audio_path, "rb") as f:
-            transcript = client.audio.transcriptions.create(
+            return client.audio.transcriptions.create(
                 model="gpt-4o-transcribe",  # or "whisper-1"
                 file=f
             )
 
-        # get text from visuals: 
-        st.info("Extracting text from video frames…")
-        additional_info = extract_text_from_video(video_path)
+    # Transcription (network-bound) and the frame montage (CPU-bound) are independent, so run them side by side
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        transcript_future = executor.submit(transcribe)
+        montage_future = executor.submit(create_montage_from_video, video_path, frame_interval=2, grid_width=3)
+        transcript = transcript_future.result()
+        montage_path = montage_future.result()
 
-        transcript = f"Here is the voiceover text: {transcript.text} an here is the additional text displayed visually in the video {additional_info}"
+    # Step 5: Summarize voiceover + on-screen content in a single multimodal call
+    summary = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "Summarize travel videos into clear, concise points. "
+                    "Use both the voiceover transcript and any text or places shown in the video frames."
+                ),
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": f"Here is the voiceover text: {transcript.text}"},
+                    {"type": "image_url", "image_url": {"url": image_to_data_url(montage_path)}},
+                ],
+            },
+        ]
+    )
+    return summary.choices[0].message.content
+
+
+def process_videos(uploaded_files: list):
+    client = get_client()
 
-        # Step 5: Summarize transcript
-        summary = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Summarize transcripts into clear, concise points."},
-                {"role": "user", "content": transcript}
-            ]
-        )
+    st.info(f"Processing {len(uploaded_files)} video(s)…")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(_process_one, client, uploaded_file): uploaded_file for uploaded_file in uploaded_files}
 
-        # Step 6: Display results
-        st.success(f"Summary for {uploaded_file.name}:")
-        st.write(summary.choices[0].message.content)
\ No newline at end of file
+        # Step 6: Display results as each video finishes
+        for future in as_completed(futures):
+            uploaded_file = futures[future]
+            st.subheader(uploaded_file.name)
+            st.success(f"Summary for {uploaded_file.name}:")
+            st.write(future.result())
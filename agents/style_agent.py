@@ -1,11 +1,163 @@
+import functools
 import os
 import json
+from pathlib import Path
 try:
     import tomllib  # Python 3.11+
 except ImportError:
-    tomllib = None
-from typing import Optional, List, Dict, Any
-from openai import OpenAI
+    try:
+        import tomli as tomllib  # Same API, for Python < 3.11
+    except ImportError:
+        tomllib = None
+from typing import Optional, List, Dict, Any, Callable, Type, TypeVar
+try:
+    import orjson
+
+    def _dumps_indented(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _dumps_indented(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
+from openai import BadRequestError, LengthFinishReasonError, OpenAI, pydantic_function_tool
+from pydantic import BaseModel, ConfigDict, model_validator
+
+from agents import _llm_cache
+from agents._batch import retrieve_chat_batch, submit_chat_batch
+from agents._client import MAX_RETRIES, REQUEST_TIMEOUT, get_http_client
+from agents._names import normalize_name
+
+# How long a cached recommendation stays valid, in seconds.
+CACHE_TTL_SECONDS = 24 * 60 * 60
+# Batches finish within 24h; their city -> cache key maps are kept a little longer.
+BATCH_KEYS_TTL_SECONDS = 2 * CACHE_TTL_SECONDS
+
+# Short style prompts are routed to a smaller model unless they mention one of these.
+DEFAULT_SMALL_MODEL = "gpt-4o-mini"
+DEFAULT_ROUTING_MAX_STYLE_LENGTH = 120
+# Output cap per city; 10-15 names with short addresses fit comfortably.
+MAX_COMPLETION_TOKENS_PER_CITY = 600
+# Models that accept a strict json_schema response_format; older ones fall back to JSON mode.
+# The exclusions are snapshots that share a prefix but predate structured outputs.
+STRUCTURED_OUTPUT_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+NO_STRUCTURED_OUTPUT_MODEL_PREFIXES = ("gpt-4o-2024-05-13", "o1-mini", "o1-preview")
+# Reasoning models spend part of max_completion_tokens on hidden reasoning, so they are left uncapped
+REASONING_MODEL_PREFIXES = ("gpt-5", "o1", "o3", "o4")
+
+COMPLEX_STYLE_KEYWORDS = ("accessibility", "accessible", "wheelchair", "mobility", "allerg", "niche", "hidden gem", "off the beaten")
+
+
+class PlacesResponse(BaseModel):
+    """Schema the model must return for one city; enforced by OpenAI structured outputs."""
+    model_config = ConfigDict(extra="forbid")
+
+    places: str
+    locations: List[str]
+
+    @model_validator(mode="after")
+    def _check_counts_match(self) -> "PlacesResponse":
+        # Count separators instead of splitting, so no throwaway list is built
+        places = self.places.strip()
+        place_count = places.count("\n") + 1 if places else 0
+        if place_count != len(self.locations):
+            raise ValueError("Data mismatch: The number of places does not match the number of locations.")
+        return self
+
+    def to_city_dict(self) -> Dict[str, Any]:
+        """{"places", "locations"} plus the pre-split "place_list", so callers don't split "places" again."""
+        places = self.places.strip()
+        return {
+            "places": self.places,
+            "locations": self.locations,
+            # Same count as the validator: no places at all is [], not ['']
+            "place_list": places.split("\n") if places else [],
+        }
+
+
+class CityPlacesResponse(BaseModel):
+    """
+    One city's entry in a multi-city reply. Not count-checked on parse, so one bad
+    entry doesn't fail the whole reply; _match_cities validates each entry instead.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    city: str
+    places: str
+    locations: List[str]
+
+
+class MultiCityPlacesResponse(BaseModel):
+    """Schema for a multi-city request. Strict schemas cannot have arbitrary keys, so cities are a list."""
+    model_config = ConfigDict(extra="forbid")
+
+    cities: List[CityPlacesResponse]
+
+
+ResponseModel = TypeVar("ResponseModel", bound=BaseModel)
+
+
+def _strict_response_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Raw strict json_schema response_format for `model`, converted the way the SDK does for realtime calls."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": pydantic_function_tool(model)["function"]["parameters"],
+            "strict": True,
+        },
+    }
+
+
+def _match_cities(cities: List[str], entries: List[CityPlacesResponse]) -> Dict[str, Dict[str, Any]]:
+    """
+    Pairs the requested cities with the reply's entries by normalized name and validates
+    each matched entry. Cities with no match or an invalid entry are left out.
+    """
+    by_name = {}
+    for entry in entries:
+        by_name.setdefault(normalize_name(entry.city), entry)
+
+    matched = {}
+    for city in cities:
+        entry = by_name.get(normalize_name(city))
+        if entry is None:
+            continue
+        try:
+            matched[city] = PlacesResponse(places=entry.places, locations=entry.locations).to_city_dict()
+        except ValueError as e:
+            print(f"Warning: invalid multi-city recommendations for '{city}': {e}")
+    return matched
+
+
+@functools.lru_cache(maxsize=1)
+def _load_toml_secrets() -> Dict[str, Any]:
+    """
+    Reads the [openai] table of the secret TOML files once per process.
+    Values from keys.local.toml take precedence over keys.toml, then keys.example.toml.
+    """
+    if tomllib is None:
+        return {}
+
+    # Correctly locate the project's base directory to find the 'secret' folder
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    secret_dir = os.path.join(base_dir, 'secret')
+
+    candidates = [
+        os.path.join(secret_dir, 'keys.local.toml'),
+        os.path.join(secret_dir, 'keys.toml'),
+        os.path.join(secret_dir, 'keys.example.toml'),
+    ]
+
+    merged: Dict[str, Any] = {}
+    # Walk lowest priority first so higher-priority files overwrite it
+    for path in reversed(candidates):
+        # Read directly instead of probing with exists() first: a missing file costs one failed open()
+        try:
+            data = tomllib.loads(Path(path).read_text(encoding='utf-8'))
+            # Skip empty values, but keep numeric settings such as 0
+            merged.update({k: v for k, v in data.get('openai', {}).items() if v or (isinstance(v, int) and not isinstance(v, bool))})
+        except Exception:
+            continue
+    return merged
 
 
 class StyleAgent:
@@ -20,6 +172,7 @@ class StyleAgent:
         Initializes the StyleAgent.
         - Loads API key from parameter, environment variable, or secret/keys.local.toml.
         - Loads model from parameter, environment variable, or secret/keys.local.toml.
+        - Loads the small routing model and its style-length threshold from secret/keys.local.toml.
         """
         # API Key Loading
         if api_key:
@@ -32,7 +185,13 @@ class StyleAgent:
                 "OpenAI API key not found or is a placeholder. "
                 "Provide api_key, set OPENAI_API_KEY, or fill `secret/keys.local.toml`."
             )
-        self.client = OpenAI(api_key=resolved_api_key)
+        # Reuse the process-wide connection pool so repeated calls skip the TCP+TLS handshake
+        self.client = OpenAI(
+            api_key=resolved_api_key,
+            http_client=get_http_client(),
+            max_retries=MAX_RETRIES,
+            timeout=REQUEST_TIMEOUT,
+        )
 
         # Model loading
         if model:
@@ -40,108 +199,185 @@ class StyleAgent:
         else:
             self.model = self._load_secret_from_toml('model') or "gpt-5"
 
+        # Model routing for simple style queries
+        self.small_model = self._load_secret_from_toml('small_model') or DEFAULT_SMALL_MODEL
+        routing_max_style_length = self._load_secret_from_toml('routing_max_style_length')
+        # 0 is a valid setting (routing off), so only a missing value falls back to the default
+        self.routing_max_style_length = int(
+            DEFAULT_ROUTING_MAX_STYLE_LENGTH if routing_max_style_length is None else routing_max_style_length
+        )
+
+        # Models that turned out not to support structured outputs at request time
+        self._json_mode_models = set()
+
     def _load_secret_from_toml(self, key: str) -> Optional[str]:
         """
         Loads a secret value (like 'api_key' or 'model') from TOML files.
         Priority: keys.local.toml -> keys.toml -> keys.example.toml.
         """
-        if tomllib is None:
-            return None
+        return _load_toml_secrets().get(key)
 
-        # Correctly locate the project's base directory to find the 'secret' folder
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        secret_dir = os.path.join(base_dir, 'secret')
-        
-        candidates = [
-            os.path.join(secret_dir, 'keys.local.toml'),
-            os.path.join(secret_dir, 'keys.toml'),
-            os.path.join(secret_dir, 'keys.example.toml'),
-        ]
+    # Static instructions sent as the system message on every call. Keeping them identical
+    # across cities lets OpenAI's prompt caching reuse the prefix; only the user turn varies.
+    # The JSON schema itself is enforced through response_format, so the prompts only
+    # carry what the schema can't express: the task, the \n separator and the pairing.
+    _SYSTEM_PROMPT = """Recommend 10-15 places of the given travel style in the given city.
+"places": names separated by \\n; "locations": one address or area per place, same order.
+Example: {"places":"A\\nB","locations":["A address","B address"]}"""
 
-        for path in candidates:
-            try:
-                if not os.path.exists(path):
-                    continue
-                with open(path, 'rb') as f:
-                    data = tomllib.load(f)
-                secret_value = data.get('openai', {}).get(key)
-                if secret_value:
-                    return secret_value
-            except Exception:
-                continue
-        return None
+    _MULTI_SYSTEM_PROMPT = """Recommend 10-15 places of the given travel style in each given city, one "cities" entry per city, spelled as given.
+"places": names separated by \\n; "locations": one address or area per place, same order.
+Example: {"cities":[{"city":"X","places":"A\\nB","locations":["A address","B address"]}]}"""
 
     def _create_prompt(self, city: str, style: str) -> str:
-        """Creates a prompt that instructs the model to return a specific JSON schema."""
-        return f"""You are a helpful travel expert who provides structured data.
-A user wants a list of 10-15 {style} places to visit in {city}.
+        """Creates the per-call user message; the schema lives in _SYSTEM_PROMPT."""
+        return f"Generate the JSON for {style} places in {city} now."
 
-Your response must be a single, valid JSON object and nothing else.
-The JSON must strictly follow this schema:
-{{
-  "places": "string",
-  "locations": ["string", ...]
-}}
+    def _create_multi_prompt(self, cities: List[str], style: str) -> str:
+        """Creates the per-call user message for several cities; the schema lives in _MULTI_SYSTEM_PROMPT."""
+        city_list = "\n".join(f"- {city}" for city in cities)
+        return f"Generate the JSON for {style} places in each of these cities now:\n{city_list}"
 
-Instructions:
-1.  In the "places" field, provide a single string containing the names of the recommended places, separated by a newline character (\\n).
-2.  In the "locations" field, provide a JSON array of strings, where each string is the address or area for the corresponding place.
-3.  Ensure the number of locations in the array matches the number of places in the "places" string.
-4.  Do not include any text, explanations, or markdown formatting before or after the JSON object.
+    def pick_model(self, style: str) -> str:
+        """
+        Routes short, plain style preferences (e.g. "foodie") to the small model,
+        keeping the configured model for long or specialised ones.
+        Set routing_max_style_length to 0 to always use the configured model.
+        """
+        style = style.strip().lower()
+        if len(style) < self.routing_max_style_length and not any(k in style for k in COMPLEX_STYLE_KEYWORDS):
+            return self.small_model
+        return self.model
+
+    def _uses_structured_output(self, model: str) -> bool:
+        """Whether `model` supports structured outputs, so its replies arrive already schema-checked."""
+        return (
+            model.startswith(STRUCTURED_OUTPUT_MODEL_PREFIXES)
+            and not model.startswith(NO_STRUCTURED_OUTPUT_MODEL_PREFIXES)
+            and model not in self._json_mode_models
+        )
+
+    def _request_kwargs(self, prompt: str, model: str, system_prompt: Optional[str] = None, city_count: int = 1) -> Dict[str, Any]:
+        """Chat completion arguments shared by the realtime and batch paths."""
+        request_kwargs = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt or self._SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+        }
+        if not model.startswith(REASONING_MODEL_PREFIXES):
+            request_kwargs["temperature"] = 0.5 # Lower temperature for more predictable JSON
+            request_kwargs["max_completion_tokens"] = MAX_COMPLETION_TOKENS_PER_CITY * city_count
+        return request_kwargs
+
+    def _stream_parsed(
+        self,
+        prompt: str,
+        model: str,
+        response_format: Type[ResponseModel],
+        on_delta: Optional[Callable[[str], None]] = None,
+        system_prompt: Optional[str] = None,
+        city_count: int = 1,
+    ) -> ResponseModel:
+        """
+        Sends the prompt with a JSON-schema response format, streams the completion
+        and returns the response parsed and validated into `response_format`.
+        """
+        request_kwargs = self._request_kwargs(prompt, model, system_prompt, city_count)
+        request_kwargs["stream_options"] = {"include_usage": True}
 
-Generate the JSON for {style} places in {city} now."""
+        if not self._uses_structured_output(model):
+            return self._stream_json_mode(request_kwargs, response_format, on_delta)
 
-    def _parse_and_validate_json(self, json_string: str) -> Dict[str, Any]:
+        # The SDK accumulates the streamed chunks and parses the JSON once the stream ends.
+        # The server already enforced the schema, so that single parse is all the validation left.
+        try:
+            with self.client.chat.completions.stream(**request_kwargs, response_format=response_format) as stream:
+                for event in stream:
+                    if event.type == "content.delta" and on_delta:
+                        on_delta(event.delta)
+                completion = stream.get_final_completion()
+        except BadRequestError as e:
+            if "response_format" not in str(e) and "json_schema" not in str(e):
+                raise
+            # A model snapshot we didn't know lacks structured outputs: remember it and use JSON mode
+            print(f"Warning: {model} rejected structured outputs, falling back to JSON mode.")
+            self._json_mode_models.add(model)
+            return self._stream_json_mode(request_kwargs, response_format, on_delta)
+
+        self._log_usage(completion.usage)
+
+        choice = completion.choices[0]
+        if choice.finish_reason == 'content_filter':
+            raise ValueError("The request was blocked by OpenAI's content filter.")
+
+        if choice.message.refusal:
+            raise ValueError(f"GPT refused the request: {choice.message.refusal}")
+
+        if choice.message.parsed is None:
+            raise ValueError(f"GPT returned an empty response. Finish reason: '{choice.finish_reason}'.")
+
+        return choice.message.parsed
+
+    def _stream_json_mode(
+        self,
+        request_kwargs: Dict[str, Any],
+        response_format: Type[ResponseModel],
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> ResponseModel:
         """
-        Parses a JSON string and validates it against the required schema.
-        
-        Returns:
-            A dictionary if the JSON is valid.
-        
-        Raises:
-            ValueError: If the JSON is invalid or does not match the schema.
+        Fallback for models without structured outputs: streams a JSON-mode completion
+        and fully validates it against `response_format`, since nothing checked it server-side.
         """
-        try:
-            # Clean the string to remove potential markdown code blocks
-            if json_string.startswith("```json"):
-                json_string = json_string[7:].strip()
-            if json_string.endswith("```"):
-                json_string = json_string[:-3].strip()
-
-            data = json.loads(json_string)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to decode JSON from the model's response. Error: {e}")
-
-        # Schema validation
-        if not isinstance(data, dict):
-            raise ValueError("Invalid response: The root of the response is not a JSON object.")
-        
-        if "places" not in data or not isinstance(data["places"], str):
-            raise ValueError("Invalid schema: The 'places' key is missing or is not a string.")
-            
-        if "locations" not in data or not isinstance(data["locations"], list):
-            raise ValueError("Invalid schema: The 'locations' key is missing or is not a list.")
-
-        if not all(isinstance(loc, str) for loc in data["locations"]):
-            raise ValueError("Invalid schema: Not all items in the 'locations' list are strings.")
-
-        # Cross-validation: Ensure counts match
-        place_names = data["places"].strip().split('\n')
-        if len(place_names) != len(data["locations"]):
-            raise ValueError("Data mismatch: The number of places does not match the number of locations.")
+        request_kwargs["response_format"] = {"type": "json_object"}
 
-        return data
+        parts = []
+        finish_reason = None
+        for chunk in self.client.chat.completions.create(stream=True, **request_kwargs):
+            self._log_usage(chunk.usage)
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                parts.append(choice.delta.content)
+                if on_delta:
+                    on_delta(choice.delta.content)
+            finish_reason = choice.finish_reason or finish_reason
+
+        if finish_reason == 'content_filter':
+            raise ValueError("The request was blocked by OpenAI's content filter.")
+
+        if not parts:
+            raise ValueError(f"GPT returned an empty response. Finish reason: '{finish_reason}'.")
+
+        return response_format.model_validate_json("".join(parts))
+
+    @staticmethod
+    def _log_usage(usage) -> None:
+        if usage:
+            details = usage.prompt_tokens_details
+            cached_tokens = (details.cached_tokens or 0) if details else 0
+            print(f"StyleAgent usage: {usage.prompt_tokens} prompt tokens ({cached_tokens} cached), {usage.completion_tokens} completion tokens")
+
+    def _city_cache_key(self, city: str, style: str, model: str) -> str:
+        """On-disk cache key of a single-city request; shared by the realtime and batch paths."""
+        return _llm_cache.make_key(model=model, city=city, style=style, system=self._SYSTEM_PROMPT, prompt=self._create_prompt(city, style))
 
-    def get_recommendations(self, city: str, style: str) -> str:
+    def get_recommendations_dict(self, city: str, style: str, on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
-        The main method to get travel recommendations as a JSON string.
+        The main method to get travel recommendations, as an already-validated dictionary.
 
         Args:
             city: The destination city (e.g., "Paris").
             style: The travel style (e.g., "aesthetic").
+            on_delta: Optional callback invoked with each streamed text chunk, for progress display.
 
         Returns:
-            A single, validated JSON string conforming to the specified schema.
+            A validated {"places": str, "locations": [str], "place_list": [str]} object.
+
+        Raises:
+            ValueError: For invalid input, a rejected request or a response that fails validation.
         """
         if not city or not isinstance(city, str):
             raise ValueError("City must be a non-empty string.")
@@ -153,35 +389,143 @@ Generate the JSON for {style} places in {city} now."""
 
         try:
             prompt = self._create_prompt(city, style)
+            model = self.pick_model(style)
+
+            # Identical (model, city, style, prompt) requests are answered from the on-disk cache
+            cache_key = self._city_cache_key(city, style, model)
+            cached = _llm_cache.get(cache_key, namespace="style")
+            if isinstance(cached, dict):
+                return cached
+
+            data = self._stream_parsed(prompt, model, PlacesResponse, on_delta).to_city_dict()
+            _llm_cache.set(cache_key, data, namespace="style", ttl=CACHE_TTL_SECONDS)
+            return data
+
+        except (BadRequestError, LengthFinishReasonError) as e:
+            # Permanent request errors or a truncated reply; transient ones are already retried inside the SDK
+            raise ValueError(f"Failed to get recommendations: {e}") from e
+
+    def get_recommendations(self, city: str, style: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Same as get_recommendations_dict, but returns a JSON string conforming to the specified schema.
+        """
+        data = self.get_recommendations_dict(city, style, on_delta)
+        return _dumps_indented({"places": data["places"], "locations": data["locations"]})
+
+    def get_recommendations_multi(self, cities: List[str], style: str, on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Gets travel recommendations for several cities with a single API call.
 
-            request_kwargs = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": "You are a helpful API that returns structured JSON data according to the user's schema."},
-                    {"role": "user", "content": prompt}
-                ],
-            }
-            if self.model != "gpt-5":
-                request_kwargs["temperature"] = 0.5 # Lower temperature for more predictable JSON
-            
-            response_obj = self.client.chat.completions.create(**request_kwargs)
-            choice = response_obj.choices[0]
-            response_text = choice.message.content
+        Args:
+            cities: The destination cities (e.g., ["Paris", "Lyon"]).
+            style: The travel style (e.g., "aesthetic").
+            on_delta: Optional callback invoked with each streamed text chunk, for progress display.
 
-            if choice.finish_reason == 'content_filter':
-                raise ValueError("The request was blocked by OpenAI's content filter.")
+        Returns:
+            A dictionary mapping each city to a validated {"places": str, "locations": [str]} object,
+            with the place names also split into "place_list". Cities the reply misses
+            or answers invalidly are requested one by one through get_recommendations_dict.
 
-            if not response_text:
-                raise ValueError(f"GPT returned an empty response. Finish reason: '{choice.finish_reason}'.")
+        Raises:
+            ValueError: For invalid input, a rejected request or a response that fails validation.
+        """
+        if not cities or not all(city and isinstance(city, str) for city in cities):
+            raise ValueError("Cities must be a non-empty list of non-empty strings.")
+        if not style or not isinstance(style, str):
+            raise ValueError("Style must be a non-empty string.")
 
-            # Parse and validate the JSON
-            validated_data = self._parse_and_validate_json(response_text)
+        cities = list(dict.fromkeys(city.strip() for city in cities))
+        style = style.strip().lower()
 
-            # Re-serialize to ensure clean, valid JSON output
-            return json.dumps(validated_data, indent=2)
+        try:
+            prompt = self._create_multi_prompt(cities, style)
+            model = self.pick_model(style)
+
+            cache_key = _llm_cache.make_key(model=model, cities=cities, style=style, system=self._MULTI_SYSTEM_PROMPT, prompt=prompt)
+            cached = _llm_cache.get(cache_key, namespace="style")
+            if cached is not None:
+                return cached
+
+            parsed = self._stream_parsed(prompt, model, MultiCityPlacesResponse, on_delta, self._MULTI_SYSTEM_PROMPT, len(cities))
+
+            result = _match_cities(cities, parsed.cities)
+            # A city the reply missed, misnamed or got wrong gets its own request
+            for city in cities:
+                if city not in result:
+                    print(f"Warning: no usable multi-city recommendations for '{city}', requesting it separately.")
+                    result[city] = self.get_recommendations_dict(city, style, on_delta)
+            result = {city: result[city] for city in cities}
+
+            _llm_cache.set(cache_key, result, namespace="style", ttl=CACHE_TTL_SECONDS)
+            return result
+
+        except (BadRequestError, LengthFinishReasonError) as e:
+            # Permanent request errors or a truncated reply; transient ones are already retried inside the SDK
+            raise ValueError(f"Failed to get recommendations: {e}") from e
+
+    def submit_batch(self, cities: List[str], style: str) -> str:
+        """
+        Submits one recommendation request per city through the OpenAI Batch API
+        (half the price of realtime calls, finishes within 24h).
+
+        Returns:
+            The batch id, to be passed to `collect_batch`.
+        """
+        if not cities or not all(city and isinstance(city, str) for city in cities):
+            raise ValueError("Cities must be a non-empty list of non-empty strings.")
+        if not style or not isinstance(style, str):
+            raise ValueError("Style must be a non-empty string.")
+
+        style = style.strip().lower()
+        model = self.pick_model(style)
+
+        bodies = {}
+        cache_keys = {}
+        for city in dict.fromkeys(city.strip() for city in cities):
+            body = self._request_kwargs(self._create_prompt(city, style), model)
+            # Batch bodies are raw JSON, so the model class is converted to a strict schema up front
+            if self._uses_structured_output(model):
+                body["response_format"] = _strict_response_format(PlacesResponse)
+            else:
+                body["response_format"] = {"type": "json_object"}
+            bodies[city] = body
+            cache_keys[city] = self._city_cache_key(city, style, model)
+
+        batch_id = submit_chat_batch(self.client, bodies)
+        # Remember where each city's answer belongs, so collect_batch can warm the realtime cache
+        _llm_cache.set(batch_id, cache_keys, namespace="style_batches", ttl=BATCH_KEYS_TTL_SECONDS)
+        return batch_id
+
+    def collect_batch(self, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Checks on a batch started with `submit_batch`.
+
+        Returns:
+            None while the batch is still running, otherwise a dictionary mapping each city
+            to a validated {"places": str, "locations": [str], "place_list": [str]} object
+            (cities whose request failed or returned invalid data are left out).
+        """
+        outputs = retrieve_chat_batch(self.client, batch_id)
+        if outputs is None:
+            return None
+
+        results = {}
+        for city, content in outputs.items():
+            if content is None:
+                print(f"Warning: batch request for {city} failed. Skipping.")
+                continue
+            try:
+                results[city] = PlacesResponse.model_validate_json(content).to_city_dict()
+            except ValueError as e:
+                print(f"Warning: invalid batch response for {city}: {e}")
 
-        except Exception as e:
-            raise Exception(f"Failed to get recommendations: {e}")
+        cache_keys = _llm_cache.get(batch_id, namespace="style_batches") or {}
+        _llm_cache.set_many(
+            {cache_keys[city]: data for city, data in results.items() if city in cache_keys},
+            namespace="style",
+            ttl=CACHE_TTL_SECONDS,
+        )
+        return results
 
 
 if __name__ == "__main__":
@@ -193,15 +537,14 @@ if __name__ == "__main__":
         style = "foodie"
         print(f"Getting {style} recommendations for {city}...\n")
         
-        json_output = agent.get_recommendations(city, style)
+        data = agent.get_recommendations_dict(city, style)
         
         print("--- Raw JSON Output ---")
-        print(json_output)
+        print(_dumps_indented({"places": data["places"], "locations": data["locations"]}))
         print("-----------------------")
 
-        # Demonstrate parsing the output
-        data = json.loads(json_output)
-        places = data['places'].split('\n')
+        # The dict variant is already validated and split, no re-parsing needed
+        places = data['place_list']
         locations = data['locations']
         print("\n--- Parsed Data ---")
         for place, location in zip(places, locations):
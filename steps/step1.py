@@ -0,0 +1,20 @@
+"""Step 1: choose the destination cities."""
+import streamlit as st
+
+
+def render():
+    st.header("Step 1: Where do you want to go?")
+    num_locations = st.number_input("How many locations do you want to add?", min_value=1, max_value=20, value=1)
+    cities = []
+    for i in range(num_locations):
+        city = st.text_input(f"Enter city {i+1}", key=f"city_{i}")
+        if city:
+            cities.append(city)
+    if st.button("Next: Add dates"):
+        if cities:
+            st.session_state["cities"] = cities
+            st.session_state["step"] = 2
+            st.rerun()
+
+        else:
+            st.warning("Please enter at least one city.")
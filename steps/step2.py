@@ -0,0 +1,20 @@
+"""Step 2: travel dates for each city."""
+import streamlit as st
+
+
+def render():
+    st.header("Step 2: Select travel dates for each city")
+    cities = st.session_state.get("cities", [])
+    location_dates = {}
+    for city in cities:
+        st.markdown(f"#### {city}")
+        col1, col2 = st.columns(2)
+        with col1:
+            start = st.date_input(f"Start date for {city}", key=f"start_{city}")
+        with col2:
+            end = st.date_input(f"End date for {city}", key=f"end_{city}")
+        location_dates[city] = {"start": start.isoformat() if start else None, "end": end.isoformat() if end else None}
+    if st.button("Next: Preferences"):
+        st.session_state["location_dates"] = location_dates
+        st.session_state["step"] = 3
+        st.rerun()
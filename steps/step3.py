@@ -0,0 +1,32 @@
+"""Step 3: traveler preferences, budget and transport."""
+import streamlit as st
+
+
+def render():
+    st.header("Step 3: Traveler preferences")
+    budget = st.number_input("Budget ($)", min_value=0, max_value=None, value=500, step=10)
+    preferences = st.text_area(
+        "Enter your travel preferences (food, pace, accessibility, budget, interests)",
+        value="Slow-paced, food + museums, sustainable travel, public transport preferred",
+        height=120,
+    )
+    travelers = st.number_input("Number of travelers", min_value=1, max_value=20, value=1)
+    transport_options = st.multiselect(
+        "Allowed transport modes (app will prioritize these)",
+        options=["train", "bus", "flight", "car", "bike", "walk", "ferry"],
+        default=["train", "walk", "bus"],
+    )
+
+    dietary_restrictions = st.multiselect(
+        "Dietary restrictions (app will prioritize restaurants that abide them)",
+        options=["vegetarian", "vegan", "gluten-free", "halal", "nut-free"],
+    )
+
+    if st.button("Upload Reels Collection"):
+        st.session_state["preferences"] = preferences
+        st.session_state["budget"] = budget
+        st.session_state["travelers"] = travelers
+        st.session_state["transport_options"] = transport_options
+        st.session_state["dietary_restrictions"] = dietary_restrictions
+        st.session_state["step"] = 4
+        st.rerun()
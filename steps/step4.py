@@ -0,0 +1,51 @@
+"""Step 4: upload reels and extract the must-see locations."""
+import hashlib
+
+import streamlit as st
+
+from agents.logistics.logistics import extract_json_from_text
+from agents.multiple_reels import process_all_reels
+
+
+def reels_bundle_key(uploaded_files) -> str:
+    """Content hash of an uploaded reels collection; the same videos always give the same key."""
+    digest = hashlib.sha256()
+    for uploaded_file in uploaded_files:
+        digest.update(hashlib.sha256(uploaded_file.getvalue()).digest())
+    return digest.hexdigest()
+
+
+@st.cache_data(show_spinner=False)
+def process_reels_cached(bundle_key: str, _uploaded_files: list) -> list:
+    """Reel summaries memoized by `bundle_key`, so a rerun never processes the same videos twice."""
+    return process_all_reels(_uploaded_files)
+
+
+@st.cache_data(show_spinner=False)
+def parse_reel_summary(summary_text: str) -> dict:
+    """Parsed reel summary JSON, memoized on the summary text."""
+    return extract_json_from_text(summary_text)
+
+
+def render():
+    st.header("Step 4: Upload Reels")
+    uploaded_files = st.file_uploader("Upload your collection of reels", type=["mp4", "mov", "avi"], accept_multiple_files=True)
+
+    if uploaded_files:
+        bundle_key = reels_bundle_key(uploaded_files)
+        parsed_reels = st.session_state.setdefault("parsed_reels", {})
+        if bundle_key not in parsed_reels:
+            summary = process_reels_cached(bundle_key, uploaded_files)
+            parsed_summary = parse_reel_summary(summary[0])
+            parsed_locations = [location["name"] for location in parsed_summary["locations"]]
+            parsed_reels[bundle_key] = (parsed_summary, parsed_locations)
+        parsed_summary, parsed_locations = parsed_reels[bundle_key]
+
+        st.subheader("Parsed JSON locations")
+        st.json(parsed_locations)
+
+        st.session_state["summary"] = parsed_summary.get("summary", "")
+        st.session_state["locations"] = parsed_locations
+        st.session_state["locations_and_ratings"] = parsed_summary.get("locations", {})
+        st.session_state["step"] = 5
+        st.rerun()
@@ -0,0 +1,120 @@
+"""Step 5: style, restaurant and budget agents, then the itinerary."""
+import streamlit as st
+
+from agents.budget_agent import budget_agent
+from agents.chat_restaurants import get_restaurant_suggestions
+from agents.logistics.logistics import extract_json_from_text, generate_itinerary
+from agents.style_agent import StyleAgent
+
+
+@st.cache_resource
+def get_style_agent() -> StyleAgent:
+    """One StyleAgent per server process, so reruns don't re-read secrets or rebuild the client."""
+    return StyleAgent()
+
+
+def get_style_for_cities(style_agent: StyleAgent, cities: tuple, preferences: str, model: str, on_delta=None) -> dict:
+    """
+    Style recommendations for all cities, memoized in the session across reruns. `model` is part of the key.
+
+    Not st.cache_data: the streaming callback writes to a placeholder created outside the
+    function, which cache_data would record and then fail to replay on a hit. Across
+    sessions, StyleAgent's own on-disk cache answers repeated requests.
+    """
+    memo = st.session_state.setdefault("style_for_cities", {})
+    key = (cities, preferences, model)
+    if key not in memo:
+        memo[key] = style_agent.get_recommendations_multi(list(cities), preferences, on_delta)
+    return memo[key]
+
+
+def render():
+    st.header("Step 5: Generate Itinerary")
+    location_dates = st.session_state.get("location_dates", {})
+    budget = st.session_state.get("budget", 10000)
+    preferences = st.session_state.get("preferences", "")
+    travelers = st.session_state.get("travelers", 1)
+    transport_options = st.session_state.get("transport_options", [])
+    dietary_restrictions = st.session_state.get("dietary_restrictions", [])
+    summary = st.session_state.get("summary", "")
+    locations = st.session_state.get("locations", [])
+    locations_and_ratings = st.session_state.get("locations_and_ratings", {})
+
+    cities = list(location_dates.keys())
+
+    # ---------- Step 5b: cheaper style recommendations via the Batch API ----------
+    batch_id = st.session_state.get("style_batch_id")
+    style_batch_results = st.session_state.get("style_batch_results")
+    if batch_id is None:
+        if st.button("Schedule (cheaper)", help="Submit style recommendations as a batch job: half the price, may take minutes to hours."):
+            st.session_state["style_batch_id"] = get_style_agent().submit_batch(cities, preferences)
+            st.rerun()
+    elif style_batch_results is None:
+        st.info(f"Style batch `{batch_id}` submitted. Check back later, or click Generate Itinerary to run everything now.")
+        if st.button("Check batch status"):
+            results = get_style_agent().collect_batch(batch_id)
+            if results is None:
+                st.info("The batch is still running.")
+            else:
+                st.session_state["style_batch_results"] = results
+                st.rerun()
+    else:
+        st.success("Style recommendations from the batch job are ready.")
+
+    if st.button("Generate Itinerary"):
+        style_agent = get_style_agent()
+        # An insertion-ordered dict rather than a set, so the budget agent sees a stable order across reruns
+        style_locations = {}
+        with st.spinner("Generating Style — this may take a few seconds..."):
+            # Use batch results when they cover every city, otherwise a single request covers every city
+            style_outputs = style_batch_results or {}
+            if any(city.strip() not in style_outputs for city in cities):
+                # Show the JSON as it streams in instead of only a spinner
+                placeholder = st.empty()
+                streamed = []
+
+                def show_delta(delta: str) -> None:
+                    streamed.append(delta)
+                    placeholder.code("".join(streamed), language="json")
+
+                model = style_agent.pick_model(preferences)
+                st.caption(f"Style recommendations from `{model}`")
+                style_outputs = get_style_for_cities(style_agent, tuple(cities), preferences, model, show_delta)
+                placeholder.empty()
+            print(style_outputs)
+            for city in cities:
+                # Places recommended for several cities, and blank lines, only reach the budget agent once
+                style_locations.update(dict.fromkeys(place.strip() for place in style_outputs[city.strip()]["place_list"] if place.strip()))
+            style_locations = list(style_locations)
+
+        print("finished style")
+        print(style_locations)
+
+        diet_locations = []
+        with st.spinner("Generating Restaurants — this may take a few seconds..."):
+            for city in location_dates.keys():
+                json_output = get_restaurant_suggestions(", ".join(dietary_restrictions), city)
+                print(json_output, type(json_output))
+                print(extract_json_from_text(json_output))
+                diet_locations += extract_json_from_text(json_output)
+
+        print("finished diet")
+        print(diet_locations)
+
+        with st.spinner("Generating Budget — this may take a few seconds..."):
+            print("doing budget")
+            final_locations_info = budget_agent(locations, style_locations + diet_locations, budget)
+
+        final_locations = []
+
+        print("finished budget")
+        print(final_locations_info)
+
+        for place_info in final_locations_info["final_places"]:
+            final_locations.append(place_info["place"])
+
+        plan = generate_itinerary(location_dates, final_locations, preferences, transport_options, travelers, final_locations_info)
+
+        st.session_state["plan"] = plan
+        st.session_state["step"] = 6
+        st.rerun()
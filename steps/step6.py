@@ -0,0 +1,26 @@
+"""Step 6: show the itinerary and offer it as a download."""
+import json
+
+import streamlit as st
+
+from agents.logistics.visualize_logistics import visualize_itinerary
+
+try:
+    import orjson
+
+    def _plan_json(plan: dict) -> bytes:
+        return orjson.dumps(plan, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _plan_json(plan: dict) -> str:
+        return json.dumps(plan, indent=2)
+
+
+def render():
+    plan = st.session_state.get("plan", {})
+    visualize_itinerary(plan)
+    st.download_button(
+        "Download itinerary JSON",
+        data=_plan_json(plan),
+        file_name="itinerary.json",
+        mime="application/json",
+    )